@@ -0,0 +1,42 @@
+"""
+Author: James Aherne
+Date: 2026-10-14
+Project: Satellite Visibility Checker - Kernel Build Script
+Description:
+    This script compiles the visibility kernel from `kernels.py` ahead of time into a native
+    extension module, `altaz_kernel`, using Numba's AOT compiler (`numba.pycc`).
+    When the extension module is present, `satellite_visibility.py` imports the kernel from it
+    instead of compiling (or loading the cached compilation of) the kernel with Numba at run time,
+    which removes Numba's start-up cost from each run of the script.
+
+Dependencies:
+    - numba
+
+Notes:
+    The AOT compiled kernel runs serially; for very large datasets the parallel JIT kernel from
+    `kernels.py` may be faster. Delete the compiled `altaz_kernel` file to fall back to it.
+    The kernel is compiled for float32 positions, which is what `find_visible_indices` passes.
+    The compiled module is a separate copy of the kernel, so re-run this script after any change
+    to `kernels.py`.
+"""
+##########################################IMPORTS##########################################
+
+import os
+from numba.pycc import CC
+from kernels import compute_visible_indices
+
+##########################################CONSTANTS##########################################
+
+# Signature of the exported kernel: float32 RA, Dec and Distance, float64 ground station GCRS
+# position and vertical per unique time, int64 time index, and the sines of the altitude limits.
+KERNEL_SIGNATURE = 'i8[:](f4[:], f4[:], f4[:], f8[:, :], f8[:, :], i8[:], f8, f8)'
+
+########################################CALLING MAIN########################################
+
+if __name__ == "__main__":
+    cc = CC('altaz_kernel')
+    cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+    # The plain Python function behind the JIT kernel is compiled, so both share one implementation.
+    cc.export('compute_visible_indices', KERNEL_SIGNATURE)(compute_visible_indices.py_func)
+    cc.compile()
+    print(f"The compiled kernel has been written to {cc.output_dir}")
@@ -0,0 +1,110 @@
+"""
+Author: James Aherne
+Date: 2026-10-14
+Project: Satellite Visibility Checker - Compiled Kernels
+Description:
+    This script contains the Numba-compiled numerical kernels used by `satellite_visibility.py`.
+    The per-sample coordinate maths (spherical to cartesian conversion, GCRS to ITRS rotation,
+    and the ground station's local East-North-Up rotation) is carried out in a single compiled
+    loop over plain float32 (or float64) arrays. `compute_visible_indices` instead applies the
+    altitude limits with a horizon test on the GCRS vectors, returning only the indices of the
+    visible samples.
+
+Dependencies:
+    - numba
+    - numpy
+
+Notes:
+    Kernels run in parallel over the samples, using all available cores unless the
+    `NUMBA_NUM_THREADS` environment variable is set.
+    Kernels are compiled with `cache=True`, so the compilation cost is only paid on the first
+    run; later runs load the compiled machine code from the `__pycache__` directory.
+    Angles are returned as float32, which is ample for the visibility limits (float32 keeps
+    altitudes to well under 0.001 degrees). The rotation matrices are always float64.
+"""
+##########################################IMPORTS##########################################
+
+import math
+import numpy as np
+from numba import njit, prange
+
+##########################################CONSTANTS##########################################
+
+DEG_TO_RAD = np.float32(np.pi / 180.0)
+RAD_TO_DEG = np.float32(180.0 / np.pi)
+
+# Fast-math flags for the kernels. The "no NaN" and "no infinity" flags of fastmath=True are left
+# out, as with them a NaN position (e.g. from a blank CSV cell) compares True against the limits.
+FASTMATH_FLAGS = {'contract', 'arcp', 'reassoc', 'afn'}
+
+####################################FUNCTION DEFINITIONS####################################
+
+@njit(cache=True, fastmath=FASTMATH_FLAGS, inline='always')
+def topocentric_enu(ra_deg, dec_deg, dist_km, rot, site_xyz, sin_lat, cos_lat, sin_lon, cos_lon):
+    """Convert one GCRS position to a float32 East-North-Up vector (km) at the ground station."""
+    # Spherical to cartesian GCRS position (km)
+    ra = ra_deg * DEG_TO_RAD
+    dec = dec_deg * DEG_TO_RAD
+    x = dist_km * math.cos(dec) * math.cos(ra)
+    y = dist_km * math.cos(dec) * math.sin(ra)
+    z = dist_km * math.sin(dec)
+
+    # Rotate into ITRS and shift the origin to the ground station
+    dx = rot[0, 0] * x + rot[0, 1] * y + rot[0, 2] * z - site_xyz[0]
+    dy = rot[1, 0] * x + rot[1, 1] * y + rot[1, 2] * z - site_xyz[1]
+    dz = rot[2, 0] * x + rot[2, 1] * y + rot[2, 2] * z - site_xyz[2]
+
+    # Rotate into the ground station's local East-North-Up frame, in float64, then reduce
+    # to float32 for the angle calculations
+    east = np.float32(-sin_lon * dx + cos_lon * dy)
+    north = np.float32(-sin_lat * cos_lon * dx - sin_lat * sin_lon * dy + cos_lat * dz)
+    up = np.float32(cos_lat * cos_lon * dx + cos_lat * sin_lon * dy + sin_lat * dz)
+    return east, north, up
+
+@njit(cache=True, parallel=True, fastmath=FASTMATH_FLAGS)
+def gcrs_to_altaz(ra_deg, dec_deg, dist_km, gcrs_to_itrs, time_index, site_xyz, sin_lat, cos_lat, sin_lon, cos_lon):
+    """Convert GCRS RA, Dec and Distance to Altitude and Azimuth (degrees) at the ground station.
+
+    Sample i uses the rotation matrix gcrs_to_itrs[time_index[i]].
+    """
+    n = ra_deg.shape[0]
+    alt_deg = np.empty(n, dtype=np.float32)
+    az_deg = np.empty(n, dtype=np.float32)
+
+    for i in prange(n):
+        east, north, up = topocentric_enu(ra_deg[i], dec_deg[i], dist_km[i], gcrs_to_itrs[time_index[i]], site_xyz,
+                                          sin_lat, cos_lat, sin_lon, cos_lon)
+        alt_deg[i] = math.atan2(up, math.hypot(east, north)) * RAD_TO_DEG
+        az_deg[i] = (math.atan2(east, north) * RAD_TO_DEG) % np.float32(360.0)
+
+    return alt_deg, az_deg
+
+@njit(cache=True, parallel=True, fastmath=FASTMATH_FLAGS)
+def compute_visible_indices(ra_deg, dec_deg, dist_km, site_gcrs, up_gcrs, time_index, sin_min_alt, sin_max_alt):
+    """Return the indices of the samples whose altitude lies within the limits (given as sines).
+
+    Sample i uses the ground station vectors site_gcrs[time_index[i]] and up_gcrs[time_index[i]].
+    """
+    # The test is carried out directly on GCRS vectors: the sine of the altitude is the component
+    # of the station-to-satellite direction along the station's local vertical. Since the sine is
+    # monotonic over [-90, 90] degrees, it is compared with the sines of the limits, and neither the
+    # ITRS rotation, the azimuth nor any inverse trigonometric function is needed per sample.
+    # Samples are independent, so this pass runs in parallel and only records a True/False flag.
+    n = ra_deg.shape[0]
+    visible = np.empty(n, dtype=np.bool_)
+
+    for i in prange(n):
+        t = time_index[i]
+
+        # Spherical to cartesian GCRS position (km), relative to the ground station
+        ra = ra_deg[i] * DEG_TO_RAD
+        dec = dec_deg[i] * DEG_TO_RAD
+        dx = dist_km[i] * math.cos(dec) * math.cos(ra) - site_gcrs[t, 0]
+        dy = dist_km[i] * math.cos(dec) * math.sin(ra) - site_gcrs[t, 1]
+        dz = dist_km[i] * math.sin(dec) - site_gcrs[t, 2]
+
+        sin_alt = (dx * up_gcrs[t, 0] + dy * up_gcrs[t, 1] + dz * up_gcrs[t, 2]) / math.sqrt(dx * dx + dy * dy + dz * dz)
+        visible[i] = sin_min_alt <= sin_alt <= sin_max_alt
+
+    # Writing the indices depends on the order of the samples, so the compaction is serial.
+    return np.flatnonzero(visible)
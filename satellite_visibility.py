@@ -11,11 +11,16 @@ Description:
 
 Dependencies:
     - astropy
+    - numba
     - numpy
+    - pyerfa
     - pandas
+    - pyarrow
 
 Files:
     - satellite_visibility.py: Main script for calculating satellite visibility.
+    - kernels.py: Numba-compiled coordinate transformation kernels.
+    - build_kernel.py: Optional script to compile the visibility kernel ahead of time.
     - test_satellite_visibility.py: Unit tests to ensure the correctness of the script.
     - satellite_positions.csv: Provides satellite positional data.
     - visibility_results.csv: Provides dates and times when the satellite is visible
@@ -27,10 +32,22 @@ Notes:
 """
 ##########################################IMPORTS##########################################
 
+import functools
+import math
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 from astropy.time import Time
-from astropy.coordinates import EarthLocation, AltAz, SkyCoord
+import erfa
+try:
+    # Ahead-of-time compiled kernel, built by build_kernel.py, which avoids Numba's start-up cost.
+    # Note, it is a separate copy of the kernel: re-run build_kernel.py after changing kernels.py,
+    # or delete the compiled altaz_kernel file, as otherwise the stale copy is still used here.
+    from altaz_kernel import compute_visible_indices
+except ImportError:
+    from kernels import compute_visible_indices
 import astropy.units as u
 
 ##########################################CONSTANTS##########################################
@@ -39,71 +56,225 @@ import astropy.units as u
 INPUT_FILE = "satellite_positions.csv"
 OUTPUT_FILE = "visibility_results.csv"
 
+# Constants for the input columns and their types. The time column is kept as a plain string.
+INPUT_COLUMN_TYPES = {
+    'Time (iso)': pa.string(),
+    'RA (GCRS) [deg]': pa.float64(),
+    'Dec (GCRS) [deg]': pa.float64(),
+    'Distance (GCRS) [km]': pa.float64()
+}
+
 # Constants for the ground station location and visibility limits
 GROUND_STATION_LAT = 78.7199  # Latitude (degrees)
 GROUND_STATION_LON = 20.3493  # Longitude (degrees)
 MIN_ALTITUDE = 10.0  # Minimum observable altitude (degrees)
 MAX_ALTITUDE = 85.0  # Maximum observable altitude (degrees)
 
+# Ground station geometry, precomputed once from the constants above.
+# Note, as height is not provided, the ground station is set to sea level (0 meters) on the WGS84 ellipsoid.
+GROUND_STATION_SIN_LAT = math.sin(math.radians(GROUND_STATION_LAT))
+GROUND_STATION_COS_LAT = math.cos(math.radians(GROUND_STATION_LAT))
+GROUND_STATION_SIN_LON = math.sin(math.radians(GROUND_STATION_LON))
+GROUND_STATION_COS_LON = math.cos(math.radians(GROUND_STATION_LON))
+GROUND_STATION_ITRS = erfa.gd2gc(1, math.radians(GROUND_STATION_LON), math.radians(GROUND_STATION_LAT), 0.0) / 1000.0  # ITRS position (km)
+
 ####################################FUNCTION DEFINITIONS####################################
 
 def load_satellite_data(file_path):
     """Load satellite data from a CSV file."""
-    return pd.read_csv(file_path)
+    # The CSV is parsed by pyarrow into Arrow-backed columns, avoiding a Python object per value.
+    # Only the required columns are read, with explicit types so no type inference is needed
+    # (pyarrow would otherwise infer the time column as a timestamp).
+    convert_options = pa_csv.ConvertOptions(
+        column_types=INPUT_COLUMN_TYPES, include_columns=list(INPUT_COLUMN_TYPES)
+    )
+    # The file is memory-mapped and parsed in parallel, in blocks of 4 MiB.
+    read_options = pa_csv.ReadOptions(block_size=4 << 20, use_threads=True)
+    with pa.memory_map(file_path) as source:
+        sat_table = pa_csv.read_csv(source, read_options=read_options, convert_options=convert_options)
+
+    # The Arrow columns are wrapped (not converted) by pandas, using ArrowDtype.
+    return sat_table.to_pandas(types_mapper=pd.ArrowDtype)
 
-def clean_time_column(sat_data):
-    """Clean the Time column and convert it to a list of valid times."""
-    # Removes inherent NaN values, converts the 'Time (iso)' column to string, strips whitespace, 
-    # replaces empty strings with np.nan, and then drops any remaining NaN values.
-    valid_times = sat_data['Time (iso)'].dropna().astype(str).str.strip().replace('', np.nan).dropna()
+def valid_time_mask(sat_data):
+    """Return a True/False mask of the rows whose time is neither missing nor empty."""
+    # Strips whitespace before testing the length. For Arrow-backed columns these are vectorised
+    # string kernels with no Python str objects.
+    time_column = sat_data['Time (iso)'].str.strip()
+    return (time_column.notna() & (time_column.str.len() > 0)).to_numpy(dtype=bool, na_value=False)
+
+def clean_time_column(sat_data, already_filtered=False):
+    """Clean the Time column and convert it to a list of valid times.
+
+    Pass already_filtered=True when sat_data has already been reduced with valid_time_mask.
+    """
+    # Keeps only the rows from valid_time_mask, with whitespace stripped. Already-filtered data
+    # skips the mask, so the column is only stripped once more (for parsing).
+    valid_times = sat_data['Time (iso)']
+    if not already_filtered:
+        valid_times = valid_times[valid_time_mask(sat_data)]
+    valid_times = valid_times.str.strip()
 
     # Check if valid_times is empty
     if valid_times.empty:
         raise ValueError("No valid time data available.")
     
-    # Convert the cleaned times to astropy Time objects
-    return Time(valid_times.tolist(), format='iso')
-
-def convert_to_altaz(sat_data, times, ground_station_location):
-    """Convert satellite positions to Altitude and Azimuth using cleaned times."""
-    # Satellite coordinates (with units specified)
-    satellite_coords = SkyCoord(
-        ra=sat_data['RA (GCRS) [deg]'].values * u.deg, 
-        dec=sat_data['Dec (GCRS) [deg]'].values * u.deg, 
-        distance=sat_data['Distance (GCRS) [km]'].values * u.km,
-        frame='gcrs', obstime=times
+    # Parse the ISO strings natively into UTC datetime64 values (cache=True parses repeated strings
+    # only once), then build the astropy Time object from those, skipping its per-string parser.
+    # The resolution inferred by pandas is kept, so dates far from 1970 do not overflow.
+    try:
+        parsed_times = pd.to_datetime(valid_times, format='ISO8601', utc=True, cache=True).dt.tz_localize(None)
+    except ValueError:
+        # datetime64 cannot represent leap seconds (e.g. 23:59:60) or dates beyond its range, so
+        # these fall back to astropy's own parser (which also rejects genuinely invalid times).
+        return Time(valid_times.to_numpy(dtype=str), scale='utc')
+    return datetime64_to_time(parsed_times.to_numpy())
+
+def datetime64_to_time(values):
+    """Convert an array of UTC datetime64 values (of any resolution) to an astropy Time object."""
+    # astropy's 'datetime64' format converts every value to a Python string and parses it again,
+    # so the values are instead split into calendar fields with numpy and converted to Julian dates
+    # in a single vectorised ERFA call. datetime64 cannot hold a leap second (23:59:60) itself, so
+    # such times never reach this function (clean_time_column parses them with astropy instead).
+    days = values.astype('datetime64[D]')
+    months = values.astype('datetime64[M]')
+    years = values.astype('datetime64[Y]')
+    hours, time_of_hour = np.divmod(values - days, np.timedelta64(1, 'h'))
+    minutes, time_of_minute = np.divmod(time_of_hour, np.timedelta64(1, 'm'))
+    jd1, jd2 = erfa.dtf2d(
+        'UTC', years.astype(np.int64) + 1970, (months - years).astype(np.int64) + 1,
+        (days - months).astype(np.int64) + 1, hours, minutes, time_of_minute / np.timedelta64(1, 's')
     )
+    return Time(jd1, jd2, format='jd', scale='utc')
 
-    # Convert coordinates to AltAz (Altitude and Azimuth)
-    altaz_coords = satellite_coords.transform_to(AltAz(obstime=times, location=ground_station_location))
-    
-    return altaz_coords.alt.deg # To also return azimuth angle, use: , altaz_coords.az.deg
+# Only the most recent batch is cached (e.g. for repeated calls with the same times, such as when
+# sweeping over ground stations), holding at most ~96 bytes per sample: the 16 byte key, up to
+# 72 bytes of matrices and the 8 byte index.
+@functools.lru_cache(maxsize=1)
+def gcrs_to_itrs_matrices(jd1_bytes, jd2_bytes):
+    """Compute the GCRS to ITRS rotation matrices for the unique UTC Julian dates (given as raw bytes).
+
+    Returns the matrices for the unique dates and, for each input date, the index of its matrix.
+    """
+    # Identical timestamps share one matrix, so the matrices are only evaluated for unique dates
+    # and are never expanded back to one per sample; the kernels look them up by index instead.
+    jd = np.column_stack((np.frombuffer(jd1_bytes), np.frombuffer(jd2_bytes)))
+    unique_jd, inverse = np.unique(jd, axis=0, return_inverse=True)
+    unique_times = Time(unique_jd[:, 0], unique_jd[:, 1], format='jd', scale='utc')
+
+    # IAU 2000A precession-nutation and Earth rotation. Polar motion is under an arcsecond
+    # and is neglected here.
+    tt, ut1 = unique_times.tt, unique_times.ut1
+    matrices = erfa.c2t00a(tt.jd1, tt.jd2, ut1.jd1, ut1.jd2, 0.0, 0.0)
+    time_index = inverse.ravel()
+
+    # The cached arrays are shared between calls, so they are made read-only.
+    matrices.flags.writeable = False
+    time_index.flags.writeable = False
+    return matrices, time_index
+
+def station_geometry(ground_station_location=None):
+    """Return the ground station's ITRS position (km) and the sines and cosines of its latitude and longitude."""
+    # The default ground station uses the constants precomputed at import time.
+    if ground_station_location is None:
+        return (GROUND_STATION_ITRS, GROUND_STATION_SIN_LAT, GROUND_STATION_COS_LAT,
+                GROUND_STATION_SIN_LON, GROUND_STATION_COS_LON)
+
+    # The ground station is static in ITRS, so its position and orientation are computed once.
+    site_xyz = u.Quantity(ground_station_location.geocentric).to_value(u.km)
+    lat = ground_station_location.lat.rad
+    lon = ground_station_location.lon.rad
+    return site_xyz, np.sin(lat), np.cos(lat), np.sin(lon), np.cos(lon)
 
+def check_sample_count(ra_deg, times):
+    """Raise a ValueError unless there is exactly one time per satellite position."""
+    # The compiled kernels do not bounds-check, so mismatched inputs must be rejected beforehand.
+    if len(times) != len(ra_deg):
+        raise ValueError(f"Got {len(times)} times for {len(ra_deg)} satellite positions.")
 
-def find_visibility(sat_data, altitudes):
+def convert_to_altaz(ra_deg, dec_deg, dist_km, times, ground_station_location=None):
+    """Convert satellite positions (float32 or float64 arrays) to Altitude and Azimuth using cleaned times."""
+    check_sample_count(ra_deg, times)
+
+    # Imported here, so that numba is not loaded when the ahead-of-time compiled kernel is used.
+    from kernels import gcrs_to_altaz
+
+    # GCRS to ITRS rotation matrices, cached by the (UTC) Julian dates of the times.
+    utc = times.utc
+    gcrs_to_itrs, time_index = gcrs_to_itrs_matrices(utc.jd1.tobytes(), utc.jd2.tobytes())
+
+    # Rotate the satellite positions into the ground station's local frame with the compiled kernel.
+    altitudes, _ = gcrs_to_altaz(
+        ra_deg, dec_deg, dist_km, gcrs_to_itrs, time_index, *station_geometry(ground_station_location)
+    )
+    return altitudes # To also return azimuth angle, keep the second value returned by gcrs_to_altaz.
+
+def find_visible_indices(ra_deg, dec_deg, dist_km, times, ground_station_location=None):
+    """Find the indices of the samples where the satellite is within the visibility limits."""
+    check_sample_count(ra_deg, times)
+
+    utc = times.utc
+    gcrs_to_itrs, time_index = gcrs_to_itrs_matrices(utc.jd1.tobytes(), utc.jd2.tobytes())
+
+    # Rotate the ground station's position and local vertical (the geodetic normal) into GCRS once
+    # per unique time, using the transpose of the GCRS to ITRS rotation.
+    site_xyz, sin_lat, cos_lat, sin_lon, cos_lon = station_geometry(ground_station_location)
+    up_xyz = np.array([cos_lat * cos_lon, cos_lat * sin_lon, sin_lat])
+    site_gcrs = np.einsum('nji,j->ni', gcrs_to_itrs, site_xyz)
+    up_gcrs = np.einsum('nji,j->ni', gcrs_to_itrs, up_xyz)
+
+    # Satellites are checked against the limits with a single dot product each in the compiled kernel.
+    # All arrays are cast to the exact types of the ahead-of-time compiled kernel's signature, which
+    # does not check its argument types (e.g. np.unique gives int32 indices on some platforms).
+    return compute_visible_indices(
+        np.ascontiguousarray(ra_deg, dtype=np.float32), np.ascontiguousarray(dec_deg, dtype=np.float32),
+        np.ascontiguousarray(dist_km, dtype=np.float32), np.ascontiguousarray(site_gcrs, dtype=np.float64),
+        np.ascontiguousarray(up_gcrs, dtype=np.float64), np.ascontiguousarray(time_index, dtype=np.int64),
+        np.sin(np.deg2rad(MIN_ALTITUDE)), np.sin(np.deg2rad(MAX_ALTITUDE))
+    )
+
+def find_visibility(sat_data, visible_indices):
     """Identify visible times for the satellite."""
-    #Generate True/False mask
-    visibility_mask = (altitudes >= MIN_ALTITUDE) & (altitudes <= MAX_ALTITUDE)
-    #Return filtered results.
-    return sat_data['Time (iso)'][visibility_mask]
+    #Return the times at the visible indices. These are gathered positionally from the column's
+    #underlying array before converting to Arrow (zero-copy for Arrow-backed columns), so no
+    #intermediate Series is built and only the visible times are ever converted.
+    return pa.array(sat_data['Time (iso)'].array.take(visible_indices))
 
 def write_to_file(visible_times, output_file):
     """Write the visible times to a specified output file."""
-    visible_times.to_csv(output_file, index=False, header=['Visible Times'])
+    # The times are already formatted strings, so they are joined into a single newline-separated
+    # buffer within Arrow and written out in one call, with no per-row formatting.
+    lines = [b'Visible Times']
+    if isinstance(visible_times, pa.ChunkedArray):
+        # Large files are read in several blocks, giving one chunk per block.
+        visible_times = visible_times.combine_chunks()
+    if len(visible_times) > 0:
+        separator = pa.scalar('\n', type=visible_times.type)
+        joined = pc.binary_join(pa.ListArray.from_arrays([0, len(visible_times)], visible_times), separator)
+        lines.append(joined[0].as_buffer())
+    with open(output_file, 'wb') as file:
+        file.write(b'\n'.join(lines) + b'\n')
 
 
 def main(file_path, output_file):
-    # Load satellite data and define ground station location.
-    #Note, as height is not provided to EarthLocation, this is set to default - sea level (0 meters).
+    # Load satellite data. The ground station is defined by the precomputed constants.
     sat_data = load_satellite_data(file_path)
-    ground_station_location = EarthLocation(lat=GROUND_STATION_LAT * u.deg, lon=GROUND_STATION_LON * u.deg)
     
-    # Clean the time data
-    times = clean_time_column(sat_data)
+    # Drop the rows without a valid time, so the positions, times and output column all line up,
+    # then clean the time data
+    sat_data = sat_data[valid_time_mask(sat_data)]
+    times = clean_time_column(sat_data, already_filtered=True)
+
+    # Extract the positions once as plain float32 arrays, which are passed through the pipeline.
+    # float32 is ample for the altitude limits and halves the memory traffic of the kernel.
+    ra_deg, dec_deg, dist_km = (
+        sat_data[column].to_numpy(dtype=np.float32)
+        for column in ('RA (GCRS) [deg]', 'Dec (GCRS) [deg]', 'Distance (GCRS) [km]')
+    )
     
-    # Convert to Altitude and Azimuth using cleaned times, then find visibility
-    altitudes = convert_to_altaz(sat_data, times, ground_station_location)
-    visible_times = find_visibility(sat_data, altitudes)
+    # Find the samples within the altitude limits using cleaned times, then find visibility
+    visible_indices = find_visible_indices(ra_deg, dec_deg, dist_km, times)
+    visible_times = find_visibility(sat_data, visible_indices)
     
     # Write results to file
     write_to_file(visible_times, output_file)
@@ -10,8 +10,24 @@ Description:
 Tests:
     - test_clean_time_column: Ensures that invalid or missing time data is correctly removed.
     - test_time_conversion: Verifies that time data is converted to `astropy.time.Time` objects.
+    - test_time_conversion_edge_cases: Checks that dates far from 1970, leap seconds and the
+      ISO 'T'/'Z' form are converted correctly.
     - test_coordinate_transformation: Confirms that RA, Dec, and Distance are correctly
       transformed into Altitude and Azimuth angles.
+    - test_altitude_matches_astropy: Checks the compiled altitude calculation against astropy's
+      own GCRS to AltAz transformation.
+    - test_duplicate_times: Ensures that samples sharing a timestamp are still transformed
+      individually when their rotation matrix is shared.
+    - test_default_ground_station: Checks the precomputed ground station constants against
+      astropy's `EarthLocation`.
+    - test_visible_indices: Confirms that the fused visibility kernel selects exactly the samples
+      whose altitudes lie within the visibility limits, and skips a row with a missing RA.
+    - test_nan_position_not_visible: Ensures that samples with a missing (NaN) RA, Dec or
+      Distance are never reported as visible.
+    - test_write_visible_times: Checks that the visible times are selected by index and written
+      to the output file with a header line.
+    - test_blank_time_row: Ensures that a row with a blank time is dropped together with its
+      position, and that mismatched times and positions are rejected.
 
 Dependencies:
     - unittest
@@ -26,13 +42,22 @@ Notes:
 
 ##########################################IMPORTS##########################################
 
+import os
+import tempfile
 import unittest
 import pandas as pd
 import numpy as np
-from astropy.coordinates import EarthLocation
+from astropy.coordinates import EarthLocation, AltAz, SkyCoord
 from astropy.time import Time
 from astropy import units as u
-from satellite_visibility import clean_time_column, convert_to_altaz
+from satellite_visibility import (
+    INPUT_FILE, MIN_ALTITUDE, MAX_ALTITUDE, clean_time_column, convert_to_altaz,
+    find_visibility, find_visible_indices, load_satellite_data, main, station_geometry, valid_time_mask,
+    write_to_file
+)
+
+# The satellite position file, resolved relative to this script so the tests can run from any directory
+INPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), INPUT_FILE)
 
 class TestSatelliteVisibility(unittest.TestCase):
 
@@ -47,6 +72,11 @@ class TestSatelliteVisibility(unittest.TestCase):
 
         self.ground_station_location = EarthLocation(lat=78.7199, lon=20.3493)
 
+    def positions(self, sat_data):
+        # RA, Dec and Distance columns as float64 arrays, as passed to convert_to_altaz
+        return (sat_data[column].to_numpy(dtype=np.float64)
+                for column in ('RA (GCRS) [deg]', 'Dec (GCRS) [deg]', 'Distance (GCRS) [km]'))
+
     def test_clean_time_column(self):
         # Test for NaN removal and cleaning of time data
         data_with_nan = pd.DataFrame({
@@ -63,18 +93,121 @@ class TestSatelliteVisibility(unittest.TestCase):
         self.assertEqual(len(cleaned_times), 1)  # Should only have 1 valid time
         self.assertEqual(cleaned_times.isot[0], '2024-09-11T00:00:00.000')  # Ensure correct time remains
 
+        # Data already reduced with valid_time_mask gives the same times
+        filtered_times = clean_time_column(data_with_nan[valid_time_mask(data_with_nan)], already_filtered=True)
+        self.assertEqual(list(filtered_times.isot), list(cleaned_times.isot))
+
     def test_time_conversion(self):
         # Check that valid time strings convert to astropy Time objects
         times = clean_time_column(self.valid_data)
         self.assertEqual(len(times), 2)  # Should have 2 time objects
         self.assertIsInstance(times, Time)
 
+    def test_time_conversion_edge_cases(self):
+        # Dates far from 1970 must not overflow
+        times = clean_time_column(pd.DataFrame({'Time (iso)': ['1600-01-01 00:00:00.000', '2024-09-11T00:00:01.5Z']}))
+        self.assertEqual(list(times.iso), ['1600-01-01 00:00:00.000', '2024-09-11 00:00:01.500'])
+
+        # Leap seconds cannot be held by datetime64, but are still accepted
+        times = clean_time_column(pd.DataFrame({'Time (iso)': ['2016-12-31 23:59:60.000', '2017-01-01 00:00:00.000']}))
+        self.assertEqual(times.iso[0], '2016-12-31 23:59:60.000')
+        self.assertAlmostEqual((times[1] - times[0]).sec, 1.0)
+
     def test_coordinate_transformation(self):
             # Check altitude values
-            altitudes = convert_to_altaz(self.valid_data, Time(self.valid_data['Time (iso)'].tolist(), format='iso'), self.ground_station_location)
+            altitudes = convert_to_altaz(*self.positions(self.valid_data), Time(self.valid_data['Time (iso)'].tolist(), format='iso'), self.ground_station_location)
             self.assertIsInstance(altitudes, np.ndarray)  # Ensure output is a numpy array
             self.assertEqual(len(altitudes), len(self.valid_data))  # Should have the same number of altitude values as input data
 
+    def test_altitude_matches_astropy(self):
+        # Compare against astropy's SkyCoord transformation (agreement well within 0.1 degrees)
+        times = Time(self.valid_data['Time (iso)'].tolist(), format='iso')
+        expected = SkyCoord(
+            ra=self.valid_data['RA (GCRS) [deg]'].values * u.deg,
+            dec=self.valid_data['Dec (GCRS) [deg]'].values * u.deg,
+            distance=self.valid_data['Distance (GCRS) [km]'].values * u.km,
+            frame='gcrs', obstime=times
+        ).transform_to(AltAz(obstime=times, location=self.ground_station_location)).alt.deg
+        altitudes = convert_to_altaz(*self.positions(self.valid_data), times, self.ground_station_location)
+        np.testing.assert_allclose(altitudes, expected, atol=0.1)
+
+    def test_duplicate_times(self):
+        # Repeat each sample at the same time; each copy must give the same altitude as the original
+        times = Time(self.valid_data['Time (iso)'].tolist(), format='iso')
+        repeated = pd.concat([self.valid_data, self.valid_data], ignore_index=True)
+        repeated_times = Time(repeated['Time (iso)'].tolist(), format='iso')
+        altitudes = convert_to_altaz(*self.positions(self.valid_data), times, self.ground_station_location)
+        repeated_altitudes = convert_to_altaz(*self.positions(repeated), repeated_times, self.ground_station_location)
+        np.testing.assert_array_equal(repeated_altitudes, np.concatenate([altitudes, altitudes]))
+
+    def test_default_ground_station(self):
+        # The constants used by default should describe the same ground station as EarthLocation
+        for default, expected in zip(station_geometry(), station_geometry(self.ground_station_location)):
+            np.testing.assert_allclose(default, expected, rtol=1e-12)
+
+    def test_visible_indices(self):
+        # Check the fused kernel against the altitudes for the full satellite position file
+        sat_data = load_satellite_data(INPUT_PATH)
+        times = clean_time_column(sat_data)
+        altitudes = convert_to_altaz(*self.positions(sat_data), times, self.ground_station_location)
+        expected = np.flatnonzero((altitudes >= MIN_ALTITUDE) & (altitudes <= MAX_ALTITUDE))
+        indices = find_visible_indices(*self.positions(sat_data), times, self.ground_station_location)
+        self.assertGreater(len(indices), 0)  # The satellite should be visible at some point
+        np.testing.assert_array_equal(indices, expected)
+
+        # Blank the RA of the first visible row; it is read as missing and must be dropped from
+        # the visible samples, leaving the others unchanged
+        with open(INPUT_PATH) as file:
+            lines = file.readlines()
+        fields = lines[indices[0] + 1].split(',')
+        lines[indices[0] + 1] = ','.join([fields[0], ''] + fields[2:])
+        with tempfile.TemporaryDirectory() as directory:
+            blank_file = os.path.join(directory, 'blank_ra.csv')
+            with open(blank_file, 'w') as file:
+                file.writelines(lines)
+            blank_data = load_satellite_data(blank_file)
+        blank_indices = find_visible_indices(*self.positions(blank_data), times, self.ground_station_location)
+        np.testing.assert_array_equal(blank_indices, expected[1:])
+
+    def test_nan_position_not_visible(self):
+        # Take the visible samples from the full file, then set each of RA, Dec and Distance to NaN
+        sat_data = load_satellite_data(INPUT_PATH)
+        times = clean_time_column(sat_data)
+        positions = list(self.positions(sat_data))
+        visible = find_visible_indices(*positions, times, self.ground_station_location)
+        for column in range(3):
+            nan_positions = [position.copy() for position in positions]
+            nan_positions[column][visible] = np.nan
+            self.assertEqual(len(find_visible_indices(*nan_positions, times, self.ground_station_location)), 0)
+
+    def test_write_visible_times(self):
+        # Select the second time only, and check the file contents
+        visible_times = find_visibility(self.valid_data, np.array([1]))
+        with tempfile.TemporaryDirectory() as directory:
+            output_file = os.path.join(directory, 'visible_times.csv')
+            write_to_file(visible_times, output_file)
+            with open(output_file) as file:
+                self.assertEqual(file.read(), 'Visible Times\n2024-09-11 00:01:00.000\n')
+
+    def test_blank_time_row(self):
+        # Blank the time of one (non-visible) row; the output should match that of the full file
+        with open(INPUT_PATH) as file:
+            lines = file.readlines()
+        lines[5] = ',' + lines[5].split(',', 1)[1]
+        with tempfile.TemporaryDirectory() as directory:
+            blank_file = os.path.join(directory, 'blank_time.csv')
+            with open(blank_file, 'w') as file:
+                file.writelines(lines)
+            main(INPUT_PATH, os.path.join(directory, 'full.csv'))
+            main(blank_file, os.path.join(directory, 'blank.csv'))
+            with open(os.path.join(directory, 'full.csv')) as full, open(os.path.join(directory, 'blank.csv')) as blank:
+                self.assertEqual(blank.read(), full.read())
+
+        # Times which do not line up with the positions are rejected
+        times = clean_time_column(self.valid_data)
+        with self.assertRaises(ValueError):
+            find_visible_indices(*self.positions(self.valid_data.iloc[:1]), times, self.ground_station_location)
+
     def test_invalid_input(self):
         # Test function raises error for invalid data
         invalid_data = pd.DataFrame({
@@ -85,7 +218,7 @@ class TestSatelliteVisibility(unittest.TestCase):
         })
         with self.assertRaises(ValueError):
             times = clean_time_column(invalid_data)
-            convert_to_altaz(invalid_data, times, self.ground_station_location)
+            convert_to_altaz(*self.positions(invalid_data), times, self.ground_station_location)
 
 if __name__ == '__main__':
     unittest.main(exit=False)  # Suppresses SystemExit